@@ -225,22 +225,22 @@ const App: React.FC = () => {
                       const data = await res.json();
                       const logs: string[] = data.logs || [];
                       
-                      let activeId: string | null = null;
-                      
-                      // Find most recent processing that hasn't finished
-                      const procIdx = logs.findIndex(l => l.includes("开始处理 ID:"));
-                      if (procIdx !== -1) {
-                          const idMatch = logs[procIdx].match(/开始处理 ID: (\S+)/);
-                          if (idMatch) {
-                              const id = idMatch[1];
-                              const finishedIdx = logs.findIndex((l, idx) => idx < procIdx && (l.includes("图片下载完成") || l.includes("Failed")));
-                              
-                              if (finishedIdx === -1) {
-                                  activeId = id;
-                              }
-                          }
+                      // Several albums download at once, so pair each start line with its own
+                      // finish line. Logs are newest-first; walk them oldest-first.
+                      const pending: string[] = [];
+                      for (let i = logs.length - 1; i >= 0; i--) {
+                          const startMatch = logs[i].match(/开始处理 ID: (\S+)/);
+                          const doneMatch = logs[i].match(/(?:✅|❌) (\S+) (?:图片下载完成|失败)/);
+                          const id = startMatch?.[1] ?? doneMatch?.[1];
+                          if (!id) continue;
+                          const idx = pending.indexOf(id);
+                          if (idx !== -1) pending.splice(idx, 1);
+                          if (startMatch) pending.push(id);
                       }
 
+                      // Most recently started album that hasn't finished
+                      const activeId: string | null = pending.length > 0 ? pending[pending.length - 1] : null;
+
                       // Update ID if changed
                       if (activeId !== activeDownloadId) {
                           setActiveDownloadId(activeId);
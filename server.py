@@ -3,6 +3,7 @@
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query, Body
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import jmcomic
@@ -10,14 +11,30 @@ from jmcomic import JmOption
 
 import os
 import signal
+import sys
+import queue
+import logging
+import logging.handlers
 import json
+import gzip
 import threading
 import traceback
 import shutil
 import time
 import asyncio
 import re
+import itertools
+import collections
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 app = FastAPI()
 
@@ -35,11 +52,22 @@ app.add_middleware(
 DOWNLOAD_DIR = "./downloads"
 METADATA_FILE = "metadata.json"
 SETTINGS_FILE = "settings.json"
+LIBRARY_CACHE_FILE = "library.json.gz"
 
 if not os.path.exists(DOWNLOAD_DIR):
     os.makedirs(DOWNLOAD_DIR)
+# Resolved once; DOWNLOAD_DIR is relative to the launch directory
+DOWNLOAD_PATH = Path(DOWNLOAD_DIR).resolve()
+
+class ImageFiles(StaticFiles):
+    # Pages can still be mid-write during a download, so never let a client reuse one
+    # unchecked; revalidating via ETag/Last-Modified is a cheap 304 once it is complete
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
-app.mount("/files", StaticFiles(directory=DOWNLOAD_DIR), name="files")
+app.mount("/files", ImageFiles(directory=DOWNLOAD_DIR), name="files")
 
 # --- Models ---
 class DownloadConfig(BaseModel):
@@ -60,32 +88,119 @@ class BatchMetadataRequest(BaseModel):
     updates: List[Dict[str, Any]]
 
 # --- Helpers ---
-def natural_key(string_):
-    return [int(s) if s.isdigit() else s.lower() for s in re.split(r'(\d+)', string_)]
+_DIGITS = re.compile(r'(\d+)')
+_IMG_EXTS = frozenset({'jpg', 'jpeg', 'png', 'webp', 'gif'})
+
+@functools.lru_cache(maxsize=8192)
+def natural_key(string_, _split=_DIGITS.split):
+    # Empty leading/trailing parts are kept so str and int tokens always line up.
+    # Tuple, not list: cached keys are shared between callers and must stay immutable
+    return tuple(int(s) if s.isdigit() else s.lower() for s in _split(string_))
+
+def is_image_name(name):
+    # Lowercase only the short extension instead of the whole file name
+    dot = name.rfind('.')
+    return dot > 0 and name[dot + 1:].lower() in _IMG_EXTS
+
+def json_loads(data):
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(data, indent=True):
+    # UTF-8 bytes, same layout as json.dump(..., ensure_ascii=False, indent=2) unless indent=False
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(data):
+    # Pre-encoded body for large payloads, skipping FastAPI's jsonable_encoder walk
+    return Response(content=json_dumps(data, indent=False), media_type="application/json")
+
+def write_file_atomic(path, data: bytes):
+    # One write() into a sibling file, fsync, then swap it in so a crash never leaves half a file
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Don't leave a partial temp file behind (e.g. disk full)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# Shared pool for per-folder work during library scans; its size bounds
+# how many folders are scanned at once
+SCAN_CONCURRENCY = 16
+io_pool = ThreadPoolExecutor(max_workers=SCAN_CONCURRENCY, thread_name_prefix="io")
+
+def path_mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def details_mtime_ns(manga_path):
+    return path_mtime_ns(os.path.join(manga_path, "xiangxi.txt"))
+
+def folder_cache_key(entry: os.DirEntry):
+    # Folder mtime catches added/removed chapters; xiangxi.txt mtime catches in-place metadata rewrites
+    return (entry.stat().st_mtime_ns, details_mtime_ns(entry.path))
+
+def read_details_file(manga_path):
+    # open() doubles as the existence check (FileNotFoundError), saving a stat per folder
+    try:
+        with open(os.path.join(manga_path, "xiangxi.txt"), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
 
 # --- Logging ---
-server_logs = []
+server_logs = collections.deque(maxlen=100)
 log_lock = threading.Lock()
-metadata_lock = threading.Lock()
+
+# Console output goes through a queue so download threads never block on stdout
+logger = logging.getLogger("minecomic")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+log_listener_running = False
+log_listener_lock = threading.Lock()
 settings_lock = threading.Lock()
 
 def log(msg: str):
     timestamp = time.strftime("%H:%M:%S")
     entry = f"[{timestamp}] {msg}"
-    print(entry)
     with log_lock:
-        server_logs.insert(0, entry)
-        if len(server_logs) > 100:
-            server_logs.pop()
+        server_logs.appendleft(entry)
+    logger.info(entry)
 
 @app.get("/logs")
-def get_logs():
+async def get_logs():
     with log_lock:
-        return {"logs": server_logs}
+        return {"logs": list(server_logs)}
 
 # --- Startup ---
 @app.on_event("startup")
 async def startup_event():
+    global log_listener_running
+    with log_listener_lock:
+        log_listener.start()
+        log_listener_running = True
     loop = asyncio.get_running_loop()
     def custom_exception_handler(loop, context):
         exception = context.get("exception")
@@ -95,12 +210,28 @@ async def startup_event():
         loop.default_exception_handler(context)
     loop.set_exception_handler(custom_exception_handler)
 
+def persist_before_exit():
+    global log_listener_running
+    # Write out any metadata edits still waiting for their flush
+    metadata_store.flush()
+    # Drain queued console log lines; may run twice (/shutdown, then the lifespan event)
+    with log_listener_lock:
+        if log_listener_running:
+            log_listener.stop()
+            log_listener_running = False
+
+@app.on_event("shutdown")
+def shutdown_event():
+    persist_before_exit()
+
 # --- Shutdown Endpoint ---
 @app.post("/shutdown")
 def shutdown():
     pid = os.getpid()
     def kill_self():
         time.sleep(0.5)
+        # On Windows SIGTERM is TerminateProcess and no shutdown event runs, so persist first
+        persist_before_exit()
         os.kill(pid, signal.SIGTERM)
     threading.Thread(target=kill_self).start()
     return {"status": "shutting_down", "pid": pid}
@@ -128,8 +259,8 @@ def load_settings_file():
         return default_settings
         
     try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            saved = json.load(f)
+        with open(SETTINGS_FILE, "rb") as f:
+            saved = json_loads(f.read())
             # Merge defaults to ensure structure exists
             if "app" not in saved: saved["app"] = default_settings["app"]
             if "download" not in saved: saved["download"] = default_settings["download"]
@@ -145,8 +276,7 @@ def load_settings_file():
 
 def save_settings_file(data):
     with settings_lock:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_file_atomic(SETTINGS_FILE, json_dumps(data))
 
 @app.get("/settings")
 def get_settings():
@@ -170,98 +300,302 @@ def load_all_metadata_internal():
     if not os.path.exists(METADATA_FILE):
         return {}
     try:
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(METADATA_FILE, "rb") as f:
+            return json_loads(f.read())
     except Exception as e:
         print(f"Error loading metadata: {e}")
         return {}
 
 def save_all_metadata_internal(data):
-    with open(METADATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_file_atomic(METADATA_FILE, json_dumps(data))
+
+class RWLock:
+    # Many readers or one writer; waiting writers block new readers so they can't starve
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+# Edits within this window are coalesced into one metadata.json write
+METADATA_FLUSH_DELAY = 1.0
+
+class MetadataStore:
+    # In-memory copy of metadata.json, reloaded only when the file's mtime changes.
+    # Edits land in memory first and are flushed to disk shortly after.
+    def __init__(self):
+        self.data = {}
+        self.mtime = -1
+        self.lock = RWLock()
+        self.dirty = False
+        self._flush_timer = None
+
+    def _file_mtime(self):
+        try:
+            return os.stat(METADATA_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _refresh(self):
+        # Unflushed edits make memory authoritative until the next flush
+        if self.dirty:
+            return self.data
+        mtime = self._file_mtime()
+        if mtime != self.mtime:
+            self.data = load_all_metadata_internal()
+            self.mtime = mtime
+        return self.data
+
+    def get(self):
+        # Readers run in parallel; two of them reloading at once just load the same file
+        with self.lock.read():
+            return self._refresh()
+
+    def update(self, fn):
+        # Read-modify-write under the write lock; fn mutates the dict in place
+        with self.lock.write():
+            data = self._refresh()
+            try:
+                result = fn(data)
+            except Exception:
+                # A half-applied edit must not be flushed; reload on next get() instead
+                if not self.dirty:
+                    self.mtime = -1
+                raise
+            self.dirty = True
+            self._schedule_flush()
+            return result
+
+    def _schedule_flush(self):
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(METADATA_FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        with self.lock.write():
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self.dirty:
+                return
+            try:
+                save_all_metadata_internal(self.data)
+            except Exception as e:
+                print(f"Error saving metadata: {e}")
+                self._schedule_flush()
+                return
+            self.dirty = False
+            self.mtime = self._file_mtime()
+
+metadata_store = MetadataStore()
 
 # --- Cache ---
+# Metadata keys that scan_library copies onto each manga entry
+LIBRARY_META_FIELDS = ('title', 'readCount', 'isPinned', 'lastReadAt', 'collectionIds')
+
 class LibraryCache:
     def __init__(self):
-        self.data = []
-        self.last_updated = 0
-        self.lock = threading.Lock()
+        # (data, expires_at, encoded) swapped as one tuple so readers never see a torn state;
+        # rebinding an attribute is atomic, so get() needs no lock.
+        # encoded is the ready-to-send /library body for data
+        self._state = ([], 0, b"")
+        # Manga id -> entry in the cached list, for in-place metadata patches
+        self.index = {}
         self.cache_duration = 300 
+        # Per-folder parse results: folder name -> ((folder mtime_ns, xiangxi.txt mtime_ns, cover chapter mtime_ns), parsed)
+        # Kept across clear() and restarts since each entry is revalidated against all three mtimes
+        self.entries = {}
+        # Set when entries change outside a scan, so the next scan rewrites the file
+        self.entries_dirty = False
+        # Serializes writes to LIBRARY_CACHE_FILE
+        self.lock = threading.Lock()
+        self._load_entries()
 
-    def get(self):
-        if time.time() - self.last_updated < self.cache_duration and self.data:
-            return self.data
-        return None
+    def _load_entries(self):
+        try:
+            with gzip.open(LIBRARY_CACHE_FILE, "rb") as f:
+                saved = json_loads(f.read())["entries"]
+            self.entries = {name: (tuple(key), parsed) for name, (key, parsed) in saved.items()}
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading library cache: {e}")
+
+    def save_entries(self):
+        # Metadata is merged per request, so only the metadata-free parse results are persisted
+        self.entries_dirty = False
+        try:
+            with self.lock:
+                payload = json_dumps({"entries": dict(self.entries)}, indent=False)
+                write_file_atomic(LIBRARY_CACHE_FILE, gzip.compress(payload))
+        except Exception as e:
+            print(f"Error saving library cache: {e}")
+
+    def get_encoded(self):
+        data, expires_at, encoded = self._state
+        return encoded if data and time.monotonic() < expires_at else None
 
     def set(self, data):
-        with self.lock:
-            self.data = data
-            self.last_updated = time.time()
+        self.index = {m['id']: m for m in data}
+        encoded = json_dumps({"mangas": data}, indent=False)
+        self._state = (data, time.monotonic() + self.cache_duration, encoded)
+        return encoded
 
     def clear(self):
-        with self.lock:
-            self.data = []
-            self.last_updated = 0
+        self._state = ([], 0, b"")
+        self.index = {}
+
+    def patch(self, updates):
+        # Apply metadata edits ({"id": ..., field: value}) to the cached entries instead of forcing a full rescan
+        patched = False
+        for fields in updates:
+            manga = self.index.get(fields.get("id"))
+            if manga is not None:
+                for k in LIBRARY_META_FIELDS:
+                    if k in fields:
+                        manga[k] = fields[k]
+                patched = True
+        if patched:
+            data, expires_at, _ = self._state
+            self._state = (data, expires_at, json_dumps({"mangas": data}, indent=False))
+
+    def lookup(self, entry, key):
+        # Cached parse result for a folder, or None if it is missing or stale
+        prev = self.entries.get(entry.name)
+        if not prev or prev[0][:2] != key:
+            return None
+        # Pages still arriving in the cover chapter don't touch the folder mtime
+        cover_dir = os.path.join(entry.path, prev[1]['chapters'][0]['id'])
+        if prev[0] != key + (path_mtime_ns(cover_dir),):
+            return None
+        return prev[1]
+
+    def invalidate(self, folder_name):
+        if self.entries.pop(folder_name, None) is not None:
+            self.entries_dirty = True
+        self.clear()
 
 library_cache = LibraryCache()
 
+class TTLCache:
+    # Bounded LRU whose entries also expire after ttl seconds
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+# Search query -> response; repeat queries come from paging back and UI re-fetches
+search_cache = TTLCache(maxsize=256, ttl=120)
+# Manga folder -> (folder_cache_key + every chapter dir's mtime, full parse without metadata)
+detail_cache = TTLCache(maxsize=64, ttl=300)
+
 @app.post("/update_metadata")
-def update_metadata(data: Dict[str, Any]):
+async def update_metadata(data: Dict[str, Any]):
     manga_id = data.get("id")
     if not manga_id:
         raise HTTPException(400, "Missing ID")
     
-    # Lock the entire read-modify-write process
-    with metadata_lock:
-        all_meta = load_all_metadata_internal()
+    def apply(all_meta):
         if manga_id not in all_meta:
             all_meta[manga_id] = {}
         
         for k, v in data.items():
             if k != "id":
                 all_meta[manga_id][k] = v
-                
-        save_all_metadata_internal(all_meta)
-        # Clear cache so next library scan picks up the change immediately
-        library_cache.clear()
-        
-        return {"status": "ok", "metadata": all_meta[manga_id]}
+        return dict(all_meta[manga_id])
+
+    # Only the locked read-modify-write and file write leave the event loop
+    manga_meta = await asyncio.to_thread(metadata_store.update, apply)
+    # Patch the cached library entry so the next /library sees the change without a rescan
+    library_cache.patch([data])
+    
+    return {"status": "ok", "metadata": manga_meta}
 
 @app.post("/update_metadata_batch")
-def update_metadata_batch(req: BatchMetadataRequest):
-    with metadata_lock:
-        all_meta = load_all_metadata_internal()
-        
+async def update_metadata_batch(req: BatchMetadataRequest):
+    def apply(all_meta):
         updated_count = 0
         for item in req.updates:
             manga_id = item.get("id")
             if not manga_id: continue
             
-            if manga_id not in all_meta:
-                all_meta[manga_id] = {}
-            
-            for k, v in item.items():
-                if k != "id":
-                    all_meta[manga_id][k] = v
+            # Copy + pop + update all run in C instead of a per-key Python loop
+            fields = dict(item)
+            del fields["id"]
+            all_meta.setdefault(manga_id, {}).update(fields)
             updated_count += 1
-            
-        save_all_metadata_internal(all_meta)
-        # Clear cache so next library scan picks up the change immediately
-        library_cache.clear()
-        
-        return {"status": "ok", "updated": updated_count}
+        return updated_count
+
+    updated_count = await asyncio.to_thread(metadata_store.update, apply)
+    # Patch the cached library entries so the next /library sees the changes without a rescan
+    library_cache.patch(req.updates)
+    
+    return {"status": "ok", "updated": updated_count}
 
 @app.get("/metadata/{manga_id}")
-def get_metadata(manga_id: str):
-    # Use internal load, but no lock needed for just reading usually, 
-    # but strictly correct to lock if high concurrency writing
-    with metadata_lock:
-        all_meta = load_all_metadata_internal()
-    return all_meta.get(manga_id, {})
+async def get_metadata(manga_id: str):
+    # get() may stat/reload the file or wait on a writer, so keep it off the loop
+    all_meta = await asyncio.to_thread(metadata_store.get)
+    # Copy: the stored dict can be mutated by a concurrent update while it is serialized
+    return dict(all_meta.get(manga_id, {}))
 
 def get_jm_option(base_dir=None, suffix=".jpg", thread_count=3):
     if base_dir is None:
-        base_dir = os.path.abspath(DOWNLOAD_DIR)
+        base_dir = str(DOWNLOAD_PATH)
     
     dir_rule_config = {
         "rule": "Bd_Pname", 
@@ -307,36 +641,59 @@ def get_jm_option(base_dir=None, suffix=".jpg", thread_count=3):
 def health_check():
     return {"status": "ok", "message": "Service is running"}
 
+# Built on the first search and shared afterwards; the curl_cffi postman is
+# sessionless, so concurrent searches can use the same client
+search_client = None
+search_client_lock = threading.Lock()
+
+def get_search_client():
+    global search_client
+    with search_client_lock:
+        if search_client is None:
+            search_client = get_jm_option().new_jm_client()
+        return search_client
+
 @app.get("/search")
 def search_manga(q: str):
+    global search_client
+    cached = search_cache.get(q)
+    if cached:
+        return cached
     try:
-        option = get_jm_option()
-        client = option.new_jm_client()
+        client = get_search_client()
         search_page = client.search_site(search_query=q, page=1)
+        # Every item on a page has the same shape, so check it once on the first item
+        items = iter(search_page)
+        first = next(items, None)
         results = []
-        count = 0
-        for item in search_page:
-            if count >= 30: break
-            if isinstance(item, tuple) and len(item) >= 2:
-                album_id, title = item[0], item[1]
+        if first is not None:
+            items = itertools.islice(itertools.chain((first,), items), 30)
+            if isinstance(first, tuple) and len(first) >= 2:
+                results = [{"id": item[0], "title": item[1], "author": "JMComic", "category": "Manga"} for item in items]
             else:
-                album_id = getattr(item, 'id', str(item))
-                title = getattr(item, 'title', 'Unknown')
-            results.append({"id": album_id, "title": title, "author": "JMComic", "category": "Manga"})
-            count += 1
-        return {"query": q, "total": len(results), "results": results}
+                results = [
+                    {"id": getattr(item, 'id', str(item)), "title": getattr(item, 'title', 'Unknown'), "author": "JMComic", "category": "Manga"}
+                    for item in items
+                ]
+        response = {"query": q, "total": len(results), "results": results}
+        search_cache.set(q, response)
+        return response
     except Exception as e:
+        # Rebuild the client next time in case its domain or state went bad
+        search_client = None
         log(f"Search error: {e}")
         return {"query": q, "total": 0, "results": [], "error": str(e)}
 
 # --- Core: Parse Manga Folder ---
-def parse_manga_folder(entry: os.DirEntry, full_scan=False):
+def parse_manga_folder(entry: os.DirEntry, full_scan=False, chapter_mtimes=None):
+    # chapter_mtimes: if given, gets the mtime_ns of each chapter dir opened, taken
+    # before listing it so a cache key never runs ahead of the parse
     folder_name = entry.name
     manga_path = entry.path
     base_url = "http://localhost:8000/files"
     manga_path_enc = quote(folder_name)
 
-    details_file = os.path.join(manga_path, "xiangxi.txt")
+    details = read_details_file(manga_path)
     extra_info = {
         "id": None, 
         "title": None, 
@@ -344,15 +701,14 @@ def parse_manga_folder(entry: os.DirEntry, full_scan=False):
         "keywords": []
     }
     
-    if os.path.exists(details_file):
+    if details:
         try:
-            with open(details_file, "r", encoding="utf-8") as f:
-                saved_details = json.load(f)
-                extra_info["id"] = saved_details.get("id")
-                extra_info["title"] = saved_details.get("title")
-                extra_info["author"] = saved_details.get("author", "Unknown")
-                kws = saved_details.get("keywords", [])
-                extra_info["keywords"] = kws
+            saved_details = json_loads(details)
+            extra_info["id"] = saved_details.get("id")
+            extra_info["title"] = saved_details.get("title")
+            extra_info["author"] = saved_details.get("author", "Unknown")
+            kws = saved_details.get("keywords", [])
+            extra_info["keywords"] = kws
         except Exception as e:
             pass
 
@@ -360,50 +716,44 @@ def parse_manga_folder(entry: os.DirEntry, full_scan=False):
     manga_title = extra_info["title"] if extra_info["title"] else folder_name
 
     try:
-        sub_items = sorted([e for e in os.scandir(manga_path)], key=lambda x: natural_key(x.name))
+        # Filter while scanning, then sort only the chapter dirs
+        with os.scandir(manga_path) as it:
+            sub_dirs = [e for e in it if e.is_dir()]
     except Exception:
         return None
+    sub_dirs.sort(key=lambda x: natural_key(x.name))
+
+    if not sub_dirs:
+        return None
 
-    sub_dirs = [i for i in sub_items if i.is_dir()]
-    chapters = []
+    chapters = [{"id": e.name, "title": e.name, "pages": []} for e in sub_dirs]
     cover_url = ""
 
-    for chapter_entry in sub_dirs:
-        chapter_name = chapter_entry.name
-        pages = []
-        is_first_chapter = (chapter_entry == sub_dirs[0])
-        
-        if full_scan or is_first_chapter:
-            try:
-                images = sorted([
-                    f.name for f in os.scandir(chapter_entry.path) 
-                    if f.is_file() and f.name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif'))
-                ], key=natural_key)
-            except:
-                images = []
-
-            chapter_name_enc = quote(chapter_name)
-            if not full_scan and is_first_chapter and images:
-                cover_url = f"{base_url}/{manga_path_enc}/{chapter_name_enc}/{quote(images[0])}"
-            if full_scan:
-                for img in images:
-                    pages.append({
-                        "name": img,
-                        "url": f"{base_url}/{manga_path_enc}/{chapter_name_enc}/{quote(img)}"
-                    })
-
-        chapters.append({
-            "id": chapter_name, 
-            "title": chapter_name,
-            "pages": pages 
-        })
+    # A non-full scan only needs the cover, so only the first chapter is opened
+    for chapter, chapter_entry in zip(chapters, sub_dirs if full_scan else sub_dirs[:1]):
+        chapter_base = f"{base_url}/{manga_path_enc}/{quote(chapter_entry.name)}/"
+        if chapter_mtimes is not None:
+            chapter_mtimes.append(path_mtime_ns(chapter_entry.path))
+        try:
+            with os.scandir(chapter_entry.path) as it:
+                images = (
+                    f.name for f in it
+                    if is_image_name(f.name) and f.is_file()
+                )
+                if full_scan:
+                    _q = quote
+                    chapter["pages"] = [{"name": img, "url": chapter_base + _q(img)} for img in sorted(images, key=natural_key)]
+                else:
+                    # Only the cover is needed: one pass for the smallest name, no list or sort
+                    first_image = min(images, key=natural_key, default=None)
+                    if first_image:
+                        cover_url = chapter_base + quote(first_image)
+        except:
+            pass
 
     total_pages = 0 
     if full_scan:
         total_pages = sum(len(c['pages']) for c in chapters)
-    
-    if not chapters:
-        return None
 
     return {
         "id": manga_id,        
@@ -418,67 +768,126 @@ def parse_manga_folder(entry: os.DirEntry, full_scan=False):
     }
 
 @app.get("/library")
-def scan_library(refresh: bool = False):
+async def scan_library(refresh: bool = False):
+    # Warm cache answers on the event loop; the scan itself runs off it
+    if not refresh:
+        # Send the body encoded at cache time instead of re-serializing the whole library
+        encoded = library_cache.get_encoded()
+        if encoded:
+            return Response(content=encoded, media_type="application/json")
+    return await asyncio.to_thread(_do_scan_library, refresh)
+
+def _do_scan_library(refresh: bool):
     if refresh:
         library_cache.clear()
 
-    cached = library_cache.get()
-    if cached and not refresh:
-        return {"mangas": cached}
-
     mangas = []
     if not os.path.exists(DOWNLOAD_DIR):
         return {"mangas": []}
 
     try:
-        with metadata_lock:
-            all_metadata = load_all_metadata_internal()
+        all_metadata = metadata_store.get()
             
         with os.scandir(DOWNLOAD_DIR) as it:
-            entries = list(it)
-            entries.sort(key=lambda e: natural_key(e.name))
-            for entry in entries:
-                if entry.is_dir():
-                    manga_data = parse_manga_folder(entry, full_scan=False)
-                    if manga_data:
-                        meta = all_metadata.get(manga_data['id'], {})
-                        if 'title' in meta:
-                            manga_data['title'] = meta['title']
-                        manga_data['readCount'] = meta.get('readCount', 0)
-                        manga_data['isPinned'] = meta.get('isPinned', False)
-                        manga_data['lastReadAt'] = meta.get('lastReadAt', 0)
-                        # Add collectionIds
-                        manga_data['collectionIds'] = meta.get('collectionIds', [])
-                        
-                        mangas.append(manga_data)
+            dirs = [e for e in it if e.is_dir()]
+        dirs.sort(key=lambda e: natural_key(e.name))
+
+        # Reuse parse results for folders whose mtime, xiangxi.txt mtime and cover chapter mtime haven't moved
+        parsed_by_name = {}
+        misses = []
+        for entry in dirs:
+            try:
+                key = folder_cache_key(entry)
+            except OSError:
+                # Folder vanished after the listing (e.g. a concurrent delete); leave it out
+                continue
+            parsed = library_cache.lookup(entry, key)
+            if parsed:
+                parsed_by_name[entry.name] = parsed
+            else:
+                misses.append((entry, key))
+
+        # Parse changed folders in parallel; each one is independent filesystem work
+        def parse_miss(miss):
+            entry, key = miss
+            mtimes = []
+            parsed = parse_manga_folder(entry, full_scan=False, chapter_mtimes=mtimes)
+            return parsed, key + tuple(mtimes)
+        all_parsed = io_pool.map(parse_miss, misses)
+        # Folders without chapters yet (fresh downloads) miss every scan but store nothing
+        changed = False
+        for (entry, _), (parsed, key) in zip(misses, all_parsed):
+            if parsed:
+                library_cache.entries[entry.name] = (key, parsed)
+                changed = True
+            elif library_cache.entries.pop(entry.name, None) is not None:
+                changed = True
+            parsed_by_name[entry.name] = parsed
+
+        # Drop entries for folders that no longer exist
+        removed = library_cache.entries.keys() - parsed_by_name.keys()
+        for name in removed:
+            library_cache.entries.pop(name, None)
+
+        if changed or removed or library_cache.entries_dirty:
+            library_cache.save_entries()
+
+        for entry in dirs:
+            parsed = parsed_by_name.get(entry.name)
+            if parsed:
+                manga_data = dict(parsed)
+                meta = all_metadata.get(manga_data['id'], {})
+                if 'title' in meta:
+                    manga_data['title'] = meta['title']
+                manga_data['readCount'] = meta.get('readCount', 0)
+                manga_data['isPinned'] = meta.get('isPinned', False)
+                manga_data['lastReadAt'] = meta.get('lastReadAt', 0)
+                # Add collectionIds
+                manga_data['collectionIds'] = meta.get('collectionIds', [])
+                
+                mangas.append(manga_data)
         
-        library_cache.set(mangas)
-        return {"mangas": mangas}
+        # Reuse the bytes just encoded for the cache as the response body
+        encoded = library_cache.set(mangas)
+        return Response(content=encoded, media_type="application/json")
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
 
 @app.get("/manga_detail")
-def get_manga_detail(id: str):
-    target_path = os.path.join(DOWNLOAD_DIR, id)
-    if not os.path.exists(target_path):
+async def get_manga_detail(id: str):
+    return await asyncio.to_thread(_do_get_manga_detail, id)
+
+def _do_get_manga_detail(id: str):
+    target_path = os.path.join(DOWNLOAD_PATH, id)
+    try:
+        key = (os.stat(target_path).st_mtime_ns, details_mtime_ns(target_path))
+    except OSError:
          raise HTTPException(status_code=404, detail="Manga not found")
-    
-    class MockEntry:
-        def __init__(self, path):
-            self.path = path
-            self.name = os.path.basename(path)
-    
-    entry = MockEntry(target_path)
-    manga_data = parse_manga_folder(entry, full_scan=True)
-    
-    if not manga_data:
-        raise HTTPException(status_code=500, detail="Failed to parse manga")
-    
-    with metadata_lock:
-        all_meta = load_all_metadata_internal()
+
+    cached = detail_cache.get(id)
+    # Folder mtime covers the chapter set; pages added to a chapter only move that chapter's mtime
+    if cached and cached[0] == key + tuple(
+        path_mtime_ns(os.path.join(target_path, c['id'])) for c in cached[1]['chapters']
+    ):
+        parsed = cached[1]
+    else:
+        class MockEntry:
+            def __init__(self, path):
+                self.path = path
+                self.name = os.path.basename(path)
+        
+        entry = MockEntry(target_path)
+        mtimes = []
+        parsed = parse_manga_folder(entry, full_scan=True, chapter_mtimes=mtimes)
         
-    meta = all_meta.get(manga_data['id'], {})
+        if not parsed:
+            raise HTTPException(status_code=500, detail="Failed to parse manga")
+        detail_cache.set(id, (key + tuple(mtimes), parsed))
+
+    # Metadata goes on a copy so the cached parse stays metadata-free
+    manga_data = dict(parsed)
+    meta = metadata_store.get().get(manga_data['id'], {})
     if 'title' in meta:
         manga_data['title'] = meta['title']
     manga_data['readCount'] = meta.get('readCount', 0)
@@ -487,144 +896,195 @@ def get_manga_detail(id: str):
     # Add collectionIds
     manga_data['collectionIds'] = meta.get('collectionIds', [])
     
-    return manga_data
+    # Encoded here, on the worker thread, rather than on the event loop
+    return json_response(manga_data)
 
 @app.post("/delete_manga")
-def delete_manga(req: DeleteRequest):
+async def delete_manga(req: DeleteRequest):
     manga_name = req.manga_name
-    if ".." in manga_name or "/" in manga_name or "\\" in manga_name:
+    # Resolving catches "..", separators and symlinks alike; only direct children of downloads may go
+    target_path = (DOWNLOAD_PATH / manga_name).resolve()
+    if target_path.parent != DOWNLOAD_PATH:
          raise HTTPException(status_code=400, detail="Invalid manga name")
-    target_path = os.path.join(DOWNLOAD_DIR, manga_name)
-    if os.path.exists(target_path) and os.path.isdir(target_path):
-        try:
-            shutil.rmtree(target_path)
-            library_cache.clear() 
-            return {"status": "ok", "message": f"Deleted {manga_name}"}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
-    else:
+    try:
+        # rmtree itself reports a missing folder, no separate exists/isdir checks
+        await asyncio.to_thread(shutil.rmtree, target_path)
+    except (FileNotFoundError, NotADirectoryError):
         raise HTTPException(status_code=404, detail="Manga not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
+    # Caches are keyed by folder name; use the resolved one ("foo/." deletes foo)
+    library_cache.invalidate(target_path.name)
+    detail_cache.pop(target_path.name)
+    return {"status": "ok", "message": f"Deleted {manga_name}"}
 
 @app.post("/sync_manga_names")
-def sync_manga_names():
-    with metadata_lock:
-        all_meta = load_all_metadata_internal()
-        
-    count = 0
+async def sync_manga_names():
     if not os.path.exists(DOWNLOAD_DIR):
         return {"count": 0, "message": "Downloads directory not found"}
 
-    with os.scandir(DOWNLOAD_DIR) as it:
-        entries = list(it)
-        for entry in entries:
-            if entry.is_dir():
-                # Logic: Title = Name of the first subdirectory
-                # ID resolution: Try xiangxi.txt id, else folder name
-                
-                target_id = entry.name
-                details_path = os.path.join(entry.path, "xiangxi.txt")
-                if os.path.exists(details_path):
+    # One read-modify-write under the write lock; titles are set directly on the stored dict
+    def apply(all_meta):
+        count = 0
+        with os.scandir(DOWNLOAD_DIR) as it:
+            for entry in it:
+                if entry.is_dir():
+                    # Logic: Title = Name of the first subdirectory
+                    # ID resolution: Try xiangxi.txt id, else folder name
+
                     try:
-                        with open(details_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            if data.get('id'):
-                                target_id = str(data.get('id'))
-                    except:
-                        pass
-                
-                try:
-                    sub_dirs = sorted([e.name for e in os.scandir(entry.path) if e.is_dir()], key=natural_key)
-                    if sub_dirs:
-                        title_candidate = sub_dirs[0]
-                        
-                        if target_id not in all_meta:
-                            all_meta[target_id] = {}
-                        
-                        all_meta[target_id]["title"] = title_candidate
-                        count += 1
-                except Exception as e:
-                    print(f"Sync error for {entry.name}: {e}")
-                    continue
-    
+                        # A fresh library scan already resolved both; skip the reads
+                        parsed = library_cache.lookup(entry, folder_cache_key(entry))
+                        if parsed:
+                            all_meta.setdefault(str(parsed['id']), {})["title"] = parsed['chapters'][0]['title']
+                            count += 1
+                            continue
+
+                        target_id = entry.name
+                        details = read_details_file(entry.path)
+                        if details:
+                            try:
+                                data = json_loads(details)
+                                if data.get('id'):
+                                    target_id = str(data.get('id'))
+                            except:
+                                pass
+
+                        with os.scandir(entry.path) as sub_it:
+                            sub_dirs = sorted((e.name for e in sub_it if e.is_dir()), key=natural_key)
+                        if sub_dirs:
+                            title_candidate = sub_dirs[0]
+                            
+                            if target_id not in all_meta:
+                                all_meta[target_id] = {}
+                            
+                            all_meta[target_id]["title"] = title_candidate
+                            count += 1
+                    except Exception as e:
+                        print(f"Sync error for {entry.name}: {e}")
+                        continue
+        return count
+
+    count = await asyncio.to_thread(metadata_store.update, apply)
     if count > 0:
-        with metadata_lock:
-            # Re-read to ensure we don't clobber concurrent updates
-            current_meta = load_all_metadata_internal()
-            # Merge updates
-            for mid, mdata in all_meta.items():
-                if mid not in current_meta:
-                    current_meta[mid] = {}
-                current_meta[mid].update(mdata)
-            save_all_metadata_internal(current_meta)
-            
         library_cache.clear()
     return {"count": count}
 
-def run_download_task(album_ids: List[str], config: Optional[DownloadConfig] = None):
+# Minimum gap between starting two albums, to stay clear of rate limiting
+DOWNLOAD_START_INTERVAL = 0.5
+
+# Keeps references to running batches so they aren't garbage-collected mid-run
+download_tasks = set()
+
+def run_in_daemon_thread(fn, *args):
+    # Album downloads run for minutes: keep them out of the default executor that
+    # asyncio.to_thread shares with scans, and on daemon threads so /shutdown never waits on them
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, exc):
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def runner():
+        try:
+            result, exc = fn(*args), None
+        except BaseException as e:
+            result, exc = None, e
+        try:
+            loop.call_soon_threadsafe(settle, result, exc)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
+
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+def process_download_id(item_id: str, suffix: str, threads: int):
+    log(f"开始处理 ID: {item_id} ...")
     try:
-        # Load settings from file if config not provided, otherwise merge/use config
-        saved_settings = load_settings_file()
-        
-        suffix = config.suffix if config else saved_settings['download']['suffix']
-        threads = config.thread_count if config else saved_settings['download']['thread_count']
+        manga_base_dir = os.path.join(DOWNLOAD_PATH, item_id)
+        if not os.path.exists(manga_base_dir):
+            os.makedirs(manga_base_dir)
 
-        for item_id in album_ids:
-            item_id = str(item_id).strip()
-            if not item_id: continue
+        option = get_jm_option(
+            base_dir=manga_base_dir, 
+            suffix=suffix,
+            thread_count=threads
+        )
+        
+        if not item_id.lower().startswith('p'):
+            log(f"正在获取 {item_id} 元数据...")
+            client = option.new_jm_client()
             
-            log(f"开始处理 ID: {item_id} ...")
             try:
-                manga_base_dir = os.path.join(os.path.abspath(DOWNLOAD_DIR), item_id)
-                if not os.path.exists(manga_base_dir):
-                    os.makedirs(manga_base_dir)
-
-                option = get_jm_option(
-                    base_dir=manga_base_dir, 
-                    suffix=suffix,
-                    thread_count=threads
-                )
+                album = client.get_album_detail(item_id)
+                details = {
+                    "id": str(album.album_id),
+                    "title": album.title,
+                    "author": str(album.author) if album.author else "Unknown",
+                    "keywords": album.keywords if hasattr(album, 'keywords') else [],
+                    "tags": album.tags if hasattr(album, 'tags') else [],
+                    "description": album.description if hasattr(album, 'description') else "",
+                    "total_pages": len(album) if hasattr(album, '__len__') else 0,
+                    "downloaded_at": time.time()
+                }
+                file_path = os.path.join(manga_base_dir, "xiangxi.txt")
+                with open(file_path, "wb") as f:
+                    f.write(json_dumps(details))
                 
-                if not item_id.lower().startswith('p'):
-                    log(f"正在获取 {item_id} 元数据...")
-                    client = option.new_jm_client()
-                    
-                    try:
-                        album = client.get_album_detail(item_id)
-                        details = {
-                            "id": str(album.album_id),
-                            "title": album.title,
-                            "author": str(album.author) if album.author else "Unknown",
-                            "keywords": album.keywords if hasattr(album, 'keywords') else [],
-                            "tags": album.tags if hasattr(album, 'tags') else [],
-                            "description": album.description if hasattr(album, 'description') else "",
-                            "total_pages": len(album) if hasattr(album, '__len__') else 0,
-                            "downloaded_at": time.time()
-                        }
-                        file_path = os.path.join(manga_base_dir, "xiangxi.txt")
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            json.dump(details, f, ensure_ascii=False, indent=2)
-                        
-                        # Update global metadata cache immediately for frontend polling
-                        with metadata_lock:
-                            all_meta = load_all_metadata_internal()
-                            if item_id not in all_meta: all_meta[item_id] = {}
-                            all_meta[item_id]['title'] = album.title
-                            save_all_metadata_internal(all_meta)
-                            # Clear cache
-                            library_cache.clear()
-
-                        log(f"✅ 元数据已保存: {file_path}")
-                    except Exception as e:
-                        log(f"⚠️ 获取详情失败: {e}")
+                # Update global metadata cache immediately for frontend polling
+                def set_title(all_meta):
+                    if item_id not in all_meta: all_meta[item_id] = {}
+                    all_meta[item_id]['title'] = album.title
 
-                    jmcomic.download_album(item_id, option)
-                else:
-                    jmcomic.download_photo(item_id[1:], option)
-                    
-                log(f"✅ {item_id} 图片下载完成")
+                metadata_store.update(set_title)
+                # Clear cache
+                library_cache.clear()
+
+                log(f"✅ 元数据已保存: {file_path}")
             except Exception as e:
-                log(f"❌ {item_id} 失败: {e}")
-                traceback.print_exc()
+                log(f"⚠️ 获取详情失败: {e}")
+
+            jmcomic.download_album(item_id, option)
+        else:
+            jmcomic.download_photo(item_id[1:], option)
+            
+        library_cache.invalidate(item_id)
+        detail_cache.pop(item_id)
+        log(f"✅ {item_id} 图片下载完成")
+    except Exception as e:
+        library_cache.invalidate(item_id)
+        detail_cache.pop(item_id)
+        log(f"❌ {item_id} 失败: {e}")
+        traceback.print_exc()
+
+async def run_download_task(album_ids: List[str], config: Optional[DownloadConfig] = None):
+    try:
+        # Load settings from file if config not provided, otherwise merge/use config
+        saved_settings = await asyncio.to_thread(load_settings_file)
+        
+        suffix = config.suffix if config else saved_settings['download']['suffix']
+        threads = config.thread_count if config else saved_settings['download']['thread_count']
+
+        # Several albums download at once, bounded by the configured thread count
+        sem = asyncio.Semaphore(max(1, threads))
+        start_lock = asyncio.Lock()
+
+        async def download_one(item_id):
+            async with sem:
+                async with start_lock:
+                    await asyncio.sleep(DOWNLOAD_START_INTERVAL)
+                await run_in_daemon_thread(process_download_id, item_id, suffix, threads)
+
+        # Strip blanks and duplicates so two tasks never write the same folder
+        item_ids = dict.fromkeys(str(i).strip() for i in album_ids)
+        item_ids.pop("", None)
+        await asyncio.gather(*(download_one(item_id) for item_id in item_ids))
         
         library_cache.clear()
         log("[BATCH_DONE] 所有任务处理完毕，库缓存已清除。")
@@ -633,16 +1093,18 @@ def run_download_task(album_ids: List[str], config: Optional[DownloadConfig] = N
         log(f"下载任务发生致命错误: {e}")
 
 @app.post("/download_batch")
-def download_batch(req: DownloadRequest):
+async def download_batch(req: DownloadRequest):
     if not req.album_ids:
         raise HTTPException(status_code=400, detail="No IDs provided")
     
-    thread = threading.Thread(target=run_download_task, args=(req.album_ids, req.config))
-    thread.daemon = True
-    thread.start()
+    task = asyncio.create_task(run_download_task(req.album_ids, req.config))
+    download_tasks.add(task)
+    task.add_done_callback(download_tasks.discard)
     return {"status": "accepted", "message": f"已启动 {len(req.album_ids)} 个下载任务"}
 
 if __name__ == "__main__":
     print(f"Starting server on http://0.0.0.0:8000")
-    print(f"Downloads dir: {os.path.abspath(DOWNLOAD_DIR)}")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
+    print(f"Downloads dir: {DOWNLOAD_PATH}")
+    # loop/http "auto" pick uvloop + httptools when uvicorn[standard] is installed.
+    # Stay on one worker: logs, download threads and caches live in this process.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto", log_level="warning")